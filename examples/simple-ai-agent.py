@@ -3,39 +3,144 @@ Simple AI Agent Integration Example (Python)
 Demonstrates how an AI agent can use the AP2Stellar API to make payments
 """
 
+import asyncio
+import concurrent.futures
 import os
+import threading
 import time
 import uuid
 import jwt
 import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter, Retry
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
+
+try:
+    import httpx  # optional: enables the async client for concurrent flows
+except ImportError:
+    httpx = None
+
+try:
+    import orjson  # optional: faster JSON encode/decode than the stdlib
+except ImportError:
+    import json as orjson  # stdlib exposes the same dumps/loads surface we use
 
 
 class AIAgentPaymentService:
     """AI Agent Payment Service for AP2Stellar integration"""
 
+    # Quotes are stable for seconds at a time, so repeat queries within
+    # this window can be answered without a round trip
+    QUOTE_TTL_SECONDS = 5.0
+    QUOTE_CACHE_MAX_ENTRIES = 256
+
     def __init__(self, agent_id: str, jwt_secret: str, api_url: str = "http://localhost:3000"):
         self.agent_id = agent_id
         self.jwt_secret = jwt_secret
         self.api_url = api_url
 
+        # Persistent session: reuses TCP/TLS connections across the quote →
+        # payment → status sequence instead of handshaking on every call
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        })
+
+        # Last issued auth token and its expiry, reused while still valid;
+        # the claims below never change per instance, so build them once
+        self._cached_token: Optional[str] = None
+        self._cached_exp: int = 0
+        self._payload_template = {
+            "agent_id": agent_id,
+            "permissions": ["payment:send", "payment:receive"],
+        }
+
+        # Recently fetched quotes, keyed by (source, destination, amount)
+        self._quote_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+        # Keeps multi-line output readable when quotes run concurrently
+        self._print_lock = threading.Lock()
+
+        # Async client for fan-out flows (quote several pairs at once,
+        # poll status while another payment is in flight)
+        self._aclient = (
+            httpx.AsyncClient(
+                base_url=self.api_url,
+                limits=httpx.Limits(max_keepalive_connections=20),
+            )
+            if httpx is not None
+            else None
+        )
+
+    def close(self) -> None:
+        """Release the pooled HTTP connections"""
+        self._session.close()
+
+    async def aclose(self) -> None:
+        """Release the async client's pooled connections"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+
+    def __enter__(self) -> "AIAgentPaymentService":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     def generate_auth_token(self) -> str:
-        """Generate JWT token for authentication"""
+        """Generate JWT token for authentication, reusing the cached one while valid"""
+        now = int(time.time())
+
+        # Re-sign only when within 5 minutes of expiry
+        if self._cached_token and self._cached_exp - now > 300:
+            return self._cached_token
+
         payload = {
-            "agent_id": self.agent_id,
-            "permissions": ["payment:send", "payment:receive"],
-            "iat": int(time.time()),
-            "exp": int(time.time()) + 3600,  # 1 hour expiry
+            **self._payload_template,
+            "iat": now,
+            "exp": now + 3600,  # 1 hour expiry
         }
-        return jwt.encode(payload, self.jwt_secret, algorithm="HS256")
+        token = jwt.encode(payload, self.jwt_secret, algorithm="HS256")
+
+        self._cached_token = token
+        self._cached_exp = payload["exp"]
+        return token
+
+    def _cached_quote(self, key: tuple) -> Optional[Dict]:
+        """Return a still-fresh cached quote for key, or None"""
+        cached = self._quote_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.QUOTE_TTL_SECONDS:
+            return cached[1]
+        return None
+
+    def _store_quote(self, key: tuple, quote: Dict) -> None:
+        """Cache a quote, evicting the oldest entry when the cache is full"""
+        self._quote_cache[key] = (time.monotonic(), quote)
+        self._quote_cache.move_to_end(key)
+        if len(self._quote_cache) > self.QUOTE_CACHE_MAX_ENTRIES:
+            self._quote_cache.popitem(last=False)
 
     def get_quote(self, source_currency: str, destination_currency: str, amount: str) -> Dict:
         """Get exchange rate quote"""
         print(f"\n🔍 Getting quote: {amount} {source_currency} → {destination_currency}")
 
+        cache_key = (source_currency, destination_currency, amount)
+        cached = self._cached_quote(cache_key)
+        if cached is not None:
+            print("✅ Quote served from cache")
+            return cached
+
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.api_url}/api/v1/quote",
                 params={
                     "source_currency": source_currency,
@@ -44,14 +149,16 @@ class AIAgentPaymentService:
                 },
             )
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             if data.get("status") == "success":
                 quote = data["data"]
-                print(f"✅ Quote received:")
-                print(f"   Rate: 1 {quote['source_currency']} = {quote['exchange_rate']} {quote['destination_currency']}")
-                print(f"   You'll receive: {quote['estimated_destination_amount']} {quote['destination_currency']}")
-                print(f"   Estimated fee: {quote['estimated_fee']} XLM")
+                self._store_quote(cache_key, quote)
+                with self._print_lock:
+                    print(f"✅ Quote received:")
+                    print(f"   Rate: 1 {quote['source_currency']} = {quote['exchange_rate']} {quote['destination_currency']}")
+                    print(f"   You'll receive: {quote['estimated_destination_amount']} {quote['destination_currency']}")
+                    print(f"   Estimated fee: {quote['estimated_fee']} XLM")
                 return quote
             else:
                 raise Exception(data.get("error", {}).get("message", "Failed to get quote"))
@@ -60,12 +167,51 @@ class AIAgentPaymentService:
             print(f"❌ Quote error: {e}")
             raise
 
+    def get_quotes_batch(self, pairs: List[Dict]) -> List[Dict]:
+        """Get quotes for several currency pairs in a single request"""
+        print(f"\n🔍 Getting batch quote for {len(pairs)} currency pairs")
+
+        try:
+            response = self._session.post(
+                f"{self.api_url}/api/v1/quote/batch",
+                data=orjson.dumps({
+                    "quotes": [
+                        {
+                            "source_currency": pair["from"],
+                            "destination_currency": pair["to"],
+                            "source_amount": pair["amount"],
+                        }
+                        for pair in pairs
+                    ]
+                }),
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+
+            if data.get("status") != "success":
+                raise Exception(data.get("error", {}).get("message", "Failed to get batch quotes"))
+
+            quotes = data["data"]
+            for pair, quote in zip(pairs, quotes):
+                self._store_quote((pair["from"], pair["to"], pair["amount"]), quote)
+                with self._print_lock:
+                    print(f"✅ Quote received:")
+                    print(f"   Rate: 1 {quote['source_currency']} = {quote['exchange_rate']} {quote['destination_currency']}")
+                    print(f"   You'll receive: {quote['estimated_destination_amount']} {quote['destination_currency']}")
+                    print(f"   Estimated fee: {quote['estimated_fee']} XLM")
+            return quotes
+
+        except Exception as e:
+            print(f"❌ Batch quote error: {e}")
+            raise
+
     def send_payment(self, payment_details: Dict) -> Dict:
         """Send a payment"""
         print(f"\n💸 Sending payment: {payment_details['amount']} {payment_details['currency']}")
 
         payment_intent = {
-            "intent_id": str(uuid.uuid4()),
+            "intent_id": uuid.uuid4().hex,
             "amount": payment_details["amount"],
             "currency": payment_details["currency"],
             "recipient": {
@@ -84,13 +230,14 @@ class AIAgentPaymentService:
             payment_intent["callback_url"] = payment_details["callback_url"]
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_url}/api/v1/ap2/payment",
-                json=payment_intent,
+                data=orjson.dumps(payment_intent),
                 headers={"Content-Type": "application/json"},
             )
+            response.raise_for_status()
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
             if data.get("status") == "completed":
                 print("✅ Payment successful!")
@@ -122,13 +269,128 @@ class AIAgentPaymentService:
         print(f"\n🔍 Checking payment status for intent: {intent_id}")
 
         try:
-            response = requests.get(f"{self.api_url}/api/v1/ap2/payment/{intent_id}")
+            response = self._session.get(f"{self.api_url}/api/v1/ap2/payment/{intent_id}")
+
+            if response.status_code == 404:
+                print("   Payment not found")
+                return None
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+            print(f"   Status: {data['status']}")
+            if data.get("transaction_details"):
+                print(f"   TX Hash: {data['transaction_details']['transaction_hash']}")
+
+            return data
+
+        except Exception as e:
+            print(f"❌ Status check error: {e}")
+            raise
+
+    async def aget_quote(self, source_currency: str, destination_currency: str, amount: str) -> Dict:
+        """Async variant of get_quote, for fanning out many quotes at once"""
+        print(f"\n🔍 Getting quote: {amount} {source_currency} → {destination_currency}")
+
+        cache_key = (source_currency, destination_currency, amount)
+        cached = self._cached_quote(cache_key)
+        if cached is not None:
+            print("✅ Quote served from cache")
+            return cached
+
+        try:
+            response = await self._aclient.get(
+                "/api/v1/quote",
+                params={
+                    "source_currency": source_currency,
+                    "destination_currency": destination_currency,
+                    "source_amount": amount,
+                },
+            )
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+
+            if data.get("status") == "success":
+                quote = data["data"]
+                self._store_quote(cache_key, quote)
+                with self._print_lock:
+                    print(f"✅ Quote received:")
+                    print(f"   Rate: 1 {quote['source_currency']} = {quote['exchange_rate']} {quote['destination_currency']}")
+                    print(f"   You'll receive: {quote['estimated_destination_amount']} {quote['destination_currency']}")
+                    print(f"   Estimated fee: {quote['estimated_fee']} XLM")
+                return quote
+            else:
+                raise Exception(data.get("error", {}).get("message", "Failed to get quote"))
+
+        except Exception as e:
+            print(f"❌ Quote error: {e}")
+            raise
+
+    async def asend_payment(self, payment_details: Dict) -> Dict:
+        """Async variant of send_payment"""
+        print(f"\n💸 Sending payment: {payment_details['amount']} {payment_details['currency']}")
+
+        payment_intent = {
+            "intent_id": uuid.uuid4().hex,
+            "amount": payment_details["amount"],
+            "currency": payment_details["currency"],
+            "recipient": {
+                "agent_id": payment_details["recipient_agent_id"],
+                "payment_address": payment_details["recipient_address"],
+                "destination_currency": payment_details.get("destination_currency", payment_details["currency"]),
+            },
+            "sender": {
+                "agent_id": self.agent_id,
+                "authorization_token": self.generate_auth_token(),
+            },
+            "metadata": payment_details.get("metadata", {}),
+        }
+
+        if "callback_url" in payment_details:
+            payment_intent["callback_url"] = payment_details["callback_url"]
+
+        try:
+            response = await self._aclient.post(
+                "/api/v1/ap2/payment",
+                content=orjson.dumps(payment_intent),
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+
+            if data.get("status") == "completed":
+                print("✅ Payment successful!")
+                print(f"   TX Hash: {data['transaction_details']['transaction_hash']}")
+                return {
+                    "success": True,
+                    "intent_id": payment_intent["intent_id"],
+                    "confirmation": data,
+                }
+            else:
+                print(f"❌ Payment failed: {data.get('error', {}).get('message')}")
+                return {
+                    "success": False,
+                    "intent_id": payment_intent["intent_id"],
+                    "error": data.get("error"),
+                }
+
+        except Exception as e:
+            print(f"❌ Payment error: {e}")
+            raise
+
+    async def acheck_payment_status(self, intent_id: str) -> Optional[Dict]:
+        """Async variant of check_payment_status"""
+        print(f"\n🔍 Checking payment status for intent: {intent_id}")
+
+        try:
+            response = await self._aclient.get(f"/api/v1/ap2/payment/{intent_id}")
 
             if response.status_code == 404:
                 print("   Payment not found")
                 return None
+            response.raise_for_status()
 
-            data = response.json()
+            data = orjson.loads(response.content)
             print(f"   Status: {data['status']}")
             if data.get("transaction_details"):
                 print(f"   TX Hash: {data['transaction_details']['transaction_hash']}")
@@ -226,8 +488,26 @@ def demonstrate_ai_agent_integration():
         {"from": "USDC", "to": "XLM", "amount": "25"},
     ]
 
-    for pair in currency_pairs:
-        agent.get_quote(pair["from"], pair["to"], pair["amount"])
+    # One batch request replaces a round trip per pair; fall back to the
+    # concurrent per-pair paths if the server lacks the batch endpoint
+    try:
+        agent.get_quotes_batch(currency_pairs)
+    except Exception:
+        if httpx is not None:
+
+            async def gather_quotes():
+                await asyncio.gather(
+                    *[agent.aget_quote(pair["from"], pair["to"], pair["amount"]) for pair in currency_pairs]
+                )
+
+            asyncio.run(gather_quotes())
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(currency_pairs))) as executor:
+                list(executor.map(lambda pair: agent.get_quote(pair["from"], pair["to"], pair["amount"]), currency_pairs))
+
+    if httpx is not None:
+        asyncio.run(agent.aclose())
+    agent.close()
 
     print("\n" + "═" * 60)
     print("✅ AI Agent Integration Demo Complete!")